@@ -2,12 +2,18 @@ from __future__ import annotations
 
 import base64
 import json
-from typing import Any, Dict, List, Optional, TypedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, TypedDict
 
 from fastapi import Request
 from fastapi.responses import RedirectResponse, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, raiseload
 
 from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.user import User
+from app.services.cache import RETENTION_TTL
 
 try:
     from itsdangerous import URLSafeSerializer, BadSignature  # type: ignore
@@ -18,6 +24,8 @@ except Exception:
 
 SESSION_COOKIE = "session"
 FLASH_COOKIE = "flashes"
+FRESH_COUNTS_COOKIE = "fresh_counts"
+FLASH_COOKIE_KEY = f"{FLASH_COOKIE}=".encode("latin-1")  # b"flashes=" (Cookie e Set-Cookie)
 
 # Cookies precisam ser ASCII-safe. Por isso usamos base64 (evita erro latin-1 com emoji).
 def _b64e(obj: Any) -> str:
@@ -71,6 +79,15 @@ def get_user_id_from_request(request: Request) -> Optional[str]:
         return None
 
 
+def get_user_id_int(request: Request) -> Optional[int]:
+    # asyncpg não converte "1" -> 1 sozinho: a chave precisa ir como int
+    uid_raw = get_user_id_from_request(request)
+    try:
+        return int(uid_raw) if uid_raw else None
+    except (TypeError, ValueError):
+        return None
+
+
 class Flash(TypedDict):
     kind: str
     message: str
@@ -91,9 +108,21 @@ def add_flash(response: Response, kind: str, message: str) -> None:
 
 
 def pop_flashes(request: Request) -> List[Flash]:
+    # Quase nunca tem flash: olha os bytes do header Cookie antes de montar
+    # request.cookies (parse de todos os cookies do navegador).
+    for k, v in request.scope["headers"]:
+        if k == b"cookie":
+            if FLASH_COOKIE_KEY not in v:
+                return []
+            break
+    else:
+        return []
+
     token = request.cookies.get(FLASH_COOKIE)
     if not token:
         return []
+    # lido = consumido: o FlashClearMiddleware apaga o cookie na resposta
+    request.scope.setdefault("state", {})["clear_flashes"] = True
     try:
         data = _b64d(token)
         items = data.get("items", [])
@@ -104,9 +133,40 @@ def pop_flashes(request: Request) -> List[Flash]:
         return []
 
 
+def mark_counts_fresh(response: Response) -> None:
+    # Usuário acabou de escrever: até o cache de retenção expirar em todos os
+    # workers, as páginas dele leem a contagem direto do banco.
+    response.set_cookie(
+        FRESH_COUNTS_COOKIE,
+        "1",
+        httponly=True,
+        samesite="lax",
+        max_age=RETENTION_TTL,
+        path="/",
+    )
+
+
 def redirect(url: str, *, kind: Optional[str] = None, message: Optional[str] = None, request: Optional[Request] = None) -> RedirectResponse:
     resp = RedirectResponse(url=url, status_code=303)
     if kind and message:
         # SEM emoji aqui pra não dar problema (mas mesmo se tiver, base64 aguenta).
         add_flash(resp, kind, message)
     return resp
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """Depends(get_db): AsyncSession do request (fecha sozinha no fim)."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def load_page_user(db: AsyncSession, uid: int) -> Optional[User]:
+    """User das páginas async (upgrade/retenção): só id, email e is_pro."""
+    return await db.scalar(
+        select(User)
+        .where(User.id == uid)
+        .options(
+            load_only(User.id, User.email, User.is_pro),
+            raiseload("*"),  # User não tem relationships; lazy load acidental vira erro
+        )
+    )
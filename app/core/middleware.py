@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.deps import FLASH_COOKIE, FLASH_COOKIE_KEY
+from app.db.session import _request_scope, db_session
+
+# mesmo efeito do response.delete_cookie(FLASH_COOKIE, path="/")
+_DELETE_FLASH_COOKIE = f'{FLASH_COOKIE}=""; Max-Age=0; Path=/; SameSite=lax'.encode("latin-1")
+
+
+class FlashClearMiddleware:
+    """
+    Apaga o cookie de flashes depois que pop_flashes() leu (state.clear_flashes).
+    ASGI puro: só acrescenta um Set-Cookie no http.response.start.
+    Se a resposta já grava um flash novo (redirect com mensagem), não mexe.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and state.get("clear_flashes"):
+                headers = message.get("headers") or []
+                sets_flash = any(
+                    k.lower() == b"set-cookie" and v.startswith(FLASH_COOKIE_KEY) for k, v in headers
+                )
+                if not sets_flash:
+                    # lista nova: os headers podem ser de uma Response reaproveitada
+                    message = {**message, "headers": [*headers, (b"set-cookie", _DELETE_FLASH_COOKIE)]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class DBSessionMiddleware:
+    """
+    ASGI puro: abre o escopo da Session no começo do request e faz
+    db_session.remove() no fim (devolve a conexão pro pool).
+    Tem que ser o middleware mais externo para o escopo valer em todos.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _request_scope.set(object())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if db_session.registry.has():
+                # close() pode fazer ROLLBACK na rede: fora do event loop
+                await run_in_threadpool(db_session.remove)
+            _request_scope.reset(token)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+
+# Os assets não têm hash no nome (styles.css): cache curto + revalidação por ETag,
+# nada de "immutable" (senão o CSS novo só chegaria depois de um ano).
+STATIC_CACHE_CONTROL = os.getenv("STATIC_CACHE_CONTROL", "public, max-age=3600")
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles com ETag pelo conteúdo (blake2s) calculado uma vez no boot.
+    If-None-Match que bate responde 304 direto, sem stat/abrir o arquivo.
+    Arquivo alterado com o app rodando só ganha ETag novo no próximo restart (deploy).
+    """
+
+    def __init__(self, *, directory: str, cache_control: str = STATIC_CACHE_CONTROL, **kwargs) -> None:
+        super().__init__(directory=directory, **kwargs)
+        self.cache_control = cache_control
+        self._etags = self._build_etags(directory)
+
+    @staticmethod
+    def _build_etags(directory: str) -> Dict[str, str]:
+        root = Path(directory)
+        etags: Dict[str, str] = {}
+        for file in root.rglob("*"):
+            if file.is_file():
+                # mesma chave que StaticFiles.get_path() devolve
+                key = os.path.normpath(file.relative_to(root).as_posix())
+                etags[key] = f'"{hashlib.blake2s(file.read_bytes(), digest_size=8).hexdigest()}"'
+        return etags
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["method"] in ("GET", "HEAD"):
+            etag = self._etags.get(self.get_path(scope))
+            if etag is not None:
+                if_none_match = Headers(scope=scope).get("if-none-match", "")
+                if if_none_match and etag in (t.strip() for t in if_none_match.split(",")):
+                    await send({
+                        "type": "http.response.start",
+                        "status": 304,
+                        "headers": [
+                            (b"etag", etag.encode("latin-1")),
+                            (b"cache-control", self.cache_control.encode("latin-1")),
+                        ],
+                    })
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+
+        await super().__call__(scope, receive, send)
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        etag = self._etags.get(self.get_path(scope))
+        if etag is not None:
+            response.headers["etag"] = etag
+        response.headers["cache-control"] = self.cache_control
+        return response
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import os
+import stat
+from typing import Optional
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import ChoiceLoader, FileSystemBytecodeCache, FileSystemLoader
+from jinja2.utils import LRUCache
+
+# ✅ Um único Environment para o app inteiro: o cache de templates compilados
+# passa a valer para todas as rotas/módulos (antes cada arquivo criava o seu).
+# app/templates vem primeiro, igual ao ChoiceLoader que cada módulo montava.
+templates = Jinja2Templates(directory="app/templates")
+templates.env.loader = ChoiceLoader([  # type: ignore[attr-defined]
+    templates.env.loader,
+    FileSystemLoader("app/modules/premium_gate/templates"),
+    FileSystemLoader("app/modules/onboarding/templates"),
+    FileSystemLoader("app/modules/cases/templates"),
+    FileSystemLoader("app/modules/invite/templates"),
+    FileSystemLoader("app/modules/acquisition/templates"),
+])
+
+# Em produção os templates não mudam: sem stat() no arquivo a cada render.
+# Para desenvolvimento: JINJA_AUTO_RELOAD=1
+templates.env.auto_reload = (os.getenv("JINJA_AUTO_RELOAD") or "").strip() == "1"
+# cache_size só vale no construtor do Environment: troca o cache já criado (padrão 400)
+templates.env.cache = LRUCache(1000)
+
+# ✅ Bytecode em disco: workers novos (gunicorn/restart) pulam o parse dos templates.
+# Jinja invalida sozinho pelo checksum do fonte. Sem JINJA_CACHE_DIR, usa o padrão do
+# Jinja (diretório por uid, 0700, dono conferido): nunca um caminho fixo no /tmp
+# compartilhado, onde outro usuário poderia plantar bytecode. Fail-open: sem cache.
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    cache_dir = (os.getenv("JINJA_CACHE_DIR") or "").strip()
+    try:
+        if not cache_dir:
+            return FileSystemBytecodeCache()
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        st = os.lstat(cache_dir)
+    except (OSError, RuntimeError):
+        return None
+    if not stat.S_ISDIR(st.st_mode):
+        return None
+    # diretório configurado tem que ser nosso e fechado para os outros (no Windows não há uid)
+    if hasattr(os, "getuid") and (st.st_uid != os.getuid() or st.st_mode & 0o077):
+        return None
+    return FileSystemBytecodeCache(directory=cache_dir)
+
+
+templates.env.bytecode_cache = _bytecode_cache()
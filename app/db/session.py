@@ -1,18 +1,131 @@
 from __future__ import annotations
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import os
+import threading
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import URL, Connection, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.orm import scoped_session, sessionmaker
 
 from app.core.config import settings
 from app.models.base import Base
 
+def _sync_pool_options(url: str) -> dict:
+    # SQLite (dev) fica com o pool padrão
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    # Neon tem limite de conexões: tamanho explícito (ajustável por env) em vez do 5+10 implícito,
+    # recycle curto (o Neon derruba conexões ociosas) e timeout curto em vez de 30s de fila.
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_recycle": 300,
+        "pool_timeout": 10,
+    }
+
+
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
+    **_sync_pool_options(settings.DATABASE_URL),
 )
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+# ✅ Uma Session por request (reaproveitada por tudo que rodar no request).
+# O escopo é um ContextVar e não a thread: rotas sync rodam no threadpool e a
+# mesma thread atende vários requests. Fora de request (scripts), cai na thread.
+_request_scope: ContextVar[Optional[object]] = ContextVar("db_request_scope", default=None)
+
+
+def _session_scope() -> object:
+    return _request_scope.get() or threading.get_ident()
+
+
+db_session = scoped_session(SessionLocal, scopefunc=_session_scope)
+
+
+def _async_url(url: str) -> URL:
+    """
+    Mesma DATABASE_URL com o driver async equivalente:
+      postgresql://  -> postgresql+asyncpg://
+      sqlite://      -> sqlite+aiosqlite://
+    """
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite":
+        return u.set(drivername="sqlite+aiosqlite")
+
+    # asyncpg não entende os parâmetros SSL da libpq (formato do Neon)
+    query = dict(u.query)
+    sslmode = query.pop("sslmode", None)
+    query.pop("channel_binding", None)
+    if sslmode and "ssl" not in query:
+        query["ssl"] = sslmode
+    return u.set(drivername="postgresql+asyncpg", query=query)
+
+
+_ASYNC_URL = _async_url(settings.DATABASE_URL)
+
+# Pool explícito para o asyncpg (QueuePool comum não serve para engine async).
+# Padrão pequeno: é somado ao pool sync e multiplicado pelos workers (limite do Neon).
+# SQLite (dev) fica com o pool padrão do aiosqlite.
+_ASYNC_POOL = (
+    {}
+    if _ASYNC_URL.get_backend_name() == "sqlite"
+    else {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": int(os.getenv("DB_ASYNC_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "5")),
+        "pool_recycle": 3600,
+    }
+)
+
+
+def _asyncpg_connect_args(url: URL) -> dict:
+    if url.get_backend_name() == "sqlite":
+        return {}
+    # Cache de prepared statements por conexão (SQLAlchemy + asyncpg): query repetida
+    # não passa de novo pelo parse/plan. 0 desliga (ex.: pooler sem suporte a PREPARE).
+    cache_size = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "1024"))
+    return {
+        "prepared_statement_cache_size": cache_size,
+        "statement_cache_size": cache_size,
+        # JIT do Postgres só custa em query curta de OLTP (e nas introspecções do asyncpg)
+        "server_settings": {"jit": os.getenv("DB_JIT", "off")},
+    }
+
+
+async_engine = create_async_engine(
+    _ASYNC_URL,
+    pool_pre_ping=True,
+    connect_args=_asyncpg_connect_args(_ASYNC_URL),
+    **_ASYNC_POOL,
+)
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+def _skip_init_db() -> bool:
+    # produção com schema pelo run_neon_sql.py: SKIP_INIT_DB=1
+    return (os.getenv("SKIP_INIT_DB") or "").strip() == "1"
+
+
+def _create_missing_tables(conn: Connection) -> None:
+    # Uma consulta só (lista de tabelas) em vez de um "existe?" por tabela do create_all.
+    # Schema completo (o normal a cada boot de worker): não faz mais nada.
+    existing = set(inspect(conn).get_table_names())
+    if all(t.name in existing for t in Base.metadata.sorted_tables):
+        return
+    Base.metadata.create_all(bind=conn)
+
 
-def init_db() -> None:
-    Base.metadata.create_all(bind=engine)
+async def init_db_async() -> None:
+    # único caminho de criação do schema no boot (lifespan do main.py), pelo engine async
+    if _skip_init_db():
+        return
+    async with async_engine.begin() as conn:
+        await conn.run_sync(_create_missing_tables)
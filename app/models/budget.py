@@ -1,14 +1,39 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from sqlalchemy import DateTime, ForeignKey, Integer, Numeric, String, Text, func
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, Numeric, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column, validates
 
 from app.models.base import Base
 
+# status aceitos em PT/EN -> valor canônico gravado no banco (awaiting | won | lost)
+_STATUS_ALIASES = {
+    "fechado": "won",
+    "fechado (mês)": "won",
+    "close": "won",
+    "closed": "won",
+    "perdido": "lost",
+    "perdido (mês)": "lost",
+    "aguardando": "awaiting",
+    "pendente": "awaiting",
+    "aguardando (mês)": "awaiting",
+}
+
+BUDGET_STATUSES = ("awaiting", "won", "lost")
+
+
+def normalize_status(value: str) -> str:
+    """Alias PT/EN -> status canônico; valor desconhecido volta só limpo (minúsculo)."""
+    s = (value or "").strip().lower()
+    return _STATUS_ALIASES.get(s, s)
+
 
 class Budget(Base):
     __tablename__ = "budgets"
+    __table_args__ = (
+        # janela por usuário (retenção/painel): range scan em (user_id, created_at)
+        Index("idx_budgets_user_created_at", "user_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
@@ -22,5 +47,14 @@ class Budget(Base):
 
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="awaiting", server_default="awaiting")
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc), server_default=func.now()
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
+        index=True,
     )
+
+    @validates("status")
+    def _normalize_status(self, key: str, value: str) -> str:
+        # ✅ normaliza na escrita: leituras comparam/agrupam o valor cru
+        return normalize_status(value)
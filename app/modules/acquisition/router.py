@@ -5,14 +5,13 @@ from typing import Dict, List, Optional
 
 from fastapi import APIRouter, Form, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 
 from app.core.deps import get_user_id_from_request
+from app.core.templates import templates
 from app.db.session import SessionLocal
 from app.models.user import User
 
 router = APIRouter(prefix="/acquisition", tags=["Acquisition"])
-templates = Jinja2Templates(directory="app/templates")
 
 
 def _build_messages(nicho: str, cidade: str, servico: str) -> List[str]:
@@ -2,10 +2,9 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from jinja2 import ChoiceLoader, FileSystemLoader
 
 from app.core.deps import get_user_id_from_request, pop_flashes
+from app.core.templates import templates
 from app.db.session import SessionLocal
 from app.models.user import User
 
@@ -13,12 +12,6 @@ from app.modules.invite.services import get_or_create_invite, increment_copy, in
 
 router = APIRouter()
 
-templates = Jinja2Templates(directory="app/templates")
-templates.env.loader = ChoiceLoader([  # type: ignore[attr-defined]
-    templates.env.loader,
-    FileSystemLoader("app/modules/invite/templates"),
-])
-
 
 def _require_user_id(request: Request) -> int:
     uid_raw = get_user_id_from_request(request)
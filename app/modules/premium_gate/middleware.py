@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.deps import get_user_id_from_request
+from app.core.templates import templates
+from app.modules.premium_gate.services import _load_gate_info, get_gate_info, render_banner_html
+
+GATED_PREFIX = "/app"
+LIMITED_PATH = "/app/budgets/new"
+
+
+class PremiumGateMiddleware:
+    """
+    Banner Premium + bloqueio do POST /app/budgets/new no limite do Free.
+    ASGI puro: path/method saem direto do scope (sem montar URL), e fora
+    de /app/* (static, health, webhook, landing) passa reto.
+    Fail-open: qualquer erro => sem banner e o request segue.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # base_app.html lê request.state.premium_banner_html (state = dict do scope)
+        state = scope.setdefault("state", {})
+        state["premium_banner_html"] = ""
+
+        path = scope["path"]
+        if not path.startswith(GATED_PREFIX):
+            await self.app(scope, receive, send)
+            return
+
+        blocked = None
+        try:
+            request = Request(scope)
+            uid_raw = get_user_id_from_request(request)
+            if uid_raw:
+                # O bloqueio não usa o gate_cache: o cache é por worker e o webhook só
+                # invalida o worker que o recebeu (quem acabou de pagar seria barrado
+                # nos outros por até 30s). Só o banner aceita esse atraso.
+                limited = path == LIMITED_PATH and scope["method"] == "POST"
+                load = _load_gate_info if limited else get_gate_info
+                # consulta sync: fora do event loop
+                info = await run_in_threadpool(load, int(uid_raw))
+                state["premium_banner_html"] = render_banner_html(info)
+
+                if limited and (not info.is_pro) and info.at_limit:
+                    blocked = templates.TemplateResponse(
+                        "premium_gate/limit.html",
+                        {"request": request, "flashes": [], "user": None, "info": info},
+                        status_code=403,
+                    )
+        except Exception:
+            state["premium_banner_html"] = ""
+
+        if blocked is not None:
+            await blocked(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
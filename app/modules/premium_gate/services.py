@@ -9,6 +9,7 @@ from app.db.session import SessionLocal
 from app.models.user import User
 from app.models.budget import Budget
 from app.services.budget_service import FREE_LIMIT_TOTAL_BUDGETS
+from app.services.cache import cache_get, cache_set, gate_cache
 
 
 @dataclass
@@ -22,6 +23,16 @@ class PremiumGateInfo:
 
 
 def get_gate_info(user_id: int) -> PremiumGateInfo:
+    # ✅ 30s por usuário (navegar no /app não conta orçamentos a cada página);
+    # invalidado ao criar orçamento e quando o webhook ativa o Pro
+    info = cache_get(gate_cache, user_id)
+    if info is None:
+        info = _load_gate_info(user_id)
+        cache_set(gate_cache, user_id, info)
+    return info
+
+
+def _load_gate_info(user_id: int) -> PremiumGateInfo:
     with SessionLocal() as db:
         user = db.get(User, user_id)
         if not user:
@@ -5,17 +5,16 @@ from typing import Dict, Tuple
 
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.core.deps import get_user_id_from_request, pop_flashes
+from app.core.templates import templates
 from app.db.session import SessionLocal
 from app.models.user import User
 from app.models.budget import Budget
 
 router = APIRouter(prefix="/app/retention", tags=["retention"])
-templates = Jinja2Templates(directory="app/templates")
 
 
 def get_db():
@@ -6,16 +6,15 @@ from typing import Optional
 
 from fastapi import APIRouter, Request, Depends, Form
 from fastapi.responses import HTMLResponse, RedirectResponse, Response
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 
 from app.core.deps import pop_flashes, get_user_id_from_request
+from app.core.templates import templates
 from app.db.session import SessionLocal
 from app.models.user import User
 
 
 router = APIRouter(prefix="/app/social-proof", tags=["social-proof"])
-templates = Jinja2Templates(directory="app/templates")
 
 
 def get_db():
@@ -4,24 +4,25 @@ import os
 import re
 import io
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Request, Form, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse, Response
-from fastapi.templating import Jinja2Templates
 from sqlalchemy import select, desc
 
-from app.core.deps import get_user_id_from_request, redirect, pop_flashes
-from app.db.session import SessionLocal
+from app.core.deps import get_user_id_from_request, mark_counts_fresh, redirect, pop_flashes
+from app.core.templates import templates
+from app.db.session import db_session
 from app.models.user import User
-from app.models.budget import Budget
+from app.models.budget import BUDGET_STATUSES, Budget, normalize_status
 from app.models.case import Case  # ✅ (A) voltou
 from app.services.budget_service import can_create_budget, create_budget, FREE_LIMIT_TOTAL_BUDGETS
+from app.services.cache import invalidate_user_caches
 from app.services.whatsapp import build_budget_message, whatsapp_link, followup_message
 from app.services.followup import can_followup
 
 router = APIRouter(prefix="/app")
-templates = Jinja2Templates(directory="app/templates")
 
 # ✅ Contadores do Invite (cookie-only, sem mexer em DB)
 INVITE_COPY_COOKIE = "invite_copy_count"
@@ -115,18 +116,6 @@ def _to_local_month(dt: datetime | None, tz: timezone) -> tuple[int, int] | None
     return (dt.year, dt.month)
 
 
-# ✅ FIX: aceitar status PT/EN para o painel do mês (sem mudar o banco)
-def _norm_status(s: str) -> str:
-    s = (s or "").strip().lower()
-    if s in ("won", "fechado", "fechado (mês)", "close", "closed"):
-        return "won"
-    if s in ("lost", "perdido", "perdido (mês)"):
-        return "lost"
-    if s in ("awaiting", "aguardando", "pendente", "aguardando (mês)"):
-        return "awaiting"
-    return s
-
-
 # ✅ FIX ADMIN (sem mexer no user.py):
 # Compara user.email com a env ADMIN_EMAIL do Render
 def _is_admin_user(user: User) -> bool:
@@ -182,56 +171,56 @@ def dashboard(request: Request):
     now = datetime.now(tz)
     now_ym = (now.year, now.month)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
-
-        budgets = list(
-            db.scalars(
-                select(Budget)
-                .where(Budget.user_id == uid)
-                .order_by(desc(Budget.created_at), desc(Budget.id))
-            ).all()
-        )
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
+
+    budgets = list(
+        db.scalars(
+            select(Budget)
+            .where(Budget.user_id == uid)
+            .order_by(desc(Budget.created_at), desc(Budget.id))
+        ).all()
+    )
 
-        total = len(budgets)
-        remaining = None
-        if not user.is_pro:
-            remaining = max(0, FREE_LIMIT_TOTAL_BUDGETS - total)
-
-        # ✅ FIX DEFINITIVO: usar todos os budgets
-        month_budgets = budgets
-
-        won = [b for b in month_budgets if _norm_status(b.status or "") == "won"]
-        lost = [b for b in month_budgets if _norm_status(b.status or "") == "lost"]
-        awaiting = [b for b in month_budgets if _norm_status(b.status or "") == "awaiting"]
-
-        won_value = sum(_parse_brl_value(b.value or "") for b in won)
-        lost_value = sum(_parse_brl_value(b.value or "") for b in lost)
-
-        total_month = len(month_budgets)
-        conversion_pct = (len(won) / total_month * 100.0) if total_month > 0 else 0.0
-
-        metrics = {
-            "month_won_value": _money_brl(won_value),
-            "month_won_count": len(won),
-            "month_lost_value": _money_brl(lost_value),
-            "month_lost_count": len(lost),
-            "month_conversion_pct": f"{conversion_pct:.0f}%",
-            "month_total_count": total_month,
-            "month_awaiting": len(awaiting),
-            "month_awaiting_count": len(awaiting),
-
-            "won_value": _money_brl(won_value),
-            "won_count": len(won),
-            "lost_value": _money_brl(lost_value),
-            "lost_count": len(lost),
-            "conversion_pct": f"{conversion_pct:.0f}%",
-            "total_count": total_month,
-            "awaiting": len(awaiting),
-            "awaiting_count": len(awaiting),
-        }
+    total = len(budgets)
+    remaining = None
+    if not user.is_pro:
+        remaining = max(0, FREE_LIMIT_TOTAL_BUDGETS - total)
+
+    # ✅ FIX DEFINITIVO: usar todos os budgets
+    month_budgets = budgets
+
+    won = [b for b in month_budgets if b.status == "won"]
+    lost = [b for b in month_budgets if b.status == "lost"]
+    awaiting = [b for b in month_budgets if b.status == "awaiting"]
+
+    won_value = sum(_parse_brl_value(b.value or "") for b in won)
+    lost_value = sum(_parse_brl_value(b.value or "") for b in lost)
+
+    total_month = len(month_budgets)
+    conversion_pct = (len(won) / total_month * 100.0) if total_month > 0 else 0.0
+
+    metrics = {
+        "month_won_value": _money_brl(won_value),
+        "month_won_count": len(won),
+        "month_lost_value": _money_brl(lost_value),
+        "month_lost_count": len(lost),
+        "month_conversion_pct": f"{conversion_pct:.0f}%",
+        "month_total_count": total_month,
+        "month_awaiting": len(awaiting),
+        "month_awaiting_count": len(awaiting),
+
+        "won_value": _money_brl(won_value),
+        "won_count": len(won),
+        "lost_value": _money_brl(lost_value),
+        "lost_count": len(lost),
+        "conversion_pct": f"{conversion_pct:.0f}%",
+        "total_count": total_month,
+        "awaiting": len(awaiting),
+        "awaiting_count": len(awaiting),
+    }
 
     return templates.TemplateResponse(
         "dashboard.html",
@@ -248,48 +237,23 @@ def dashboard(request: Request):
     )
 
 
-@router.get("/upgrade", response_class=HTMLResponse)
-def upgrade_page(request: Request):
-    pop_flashes(request)
-    flashes = []
-
-    uid = _require_user(request)
-
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
-
-    checkout_url = (os.getenv("KIWIFY_CHECKOUT_URL") or "").strip()
-
-    return templates.TemplateResponse(
-        "upgrade.html",
-        {
-            "request": request,
-            "flashes": flashes,
-            "user": user,
-            "checkout_url": checkout_url,
-        },
-    )
-
-
 @router.get("/acquisition", response_class=HTMLResponse)
 def acquisition_page(request: Request):
     pop_flashes(request)
     flashes = []
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
-        if not user.is_pro:
-            return redirect(
-                "/app/upgrade",
-                kind="error",
-                message="Esse módulo é exclusivo para usuários Premium.",
-            )
+    if not user.is_pro:
+        return redirect(
+            "/app/upgrade",
+            kind="error",
+            message="Esse módulo é exclusivo para usuários Premium.",
+        )
 
     return templates.TemplateResponse(
         "acquisition.html",
@@ -364,17 +328,17 @@ def acquisition_generate(
     flashes = pop_flashes(request)
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
-        if not user.is_pro:
-            return redirect(
-                "/app/upgrade",
-                kind="error",
-                message="Esse módulo é exclusivo para usuários Premium.",
-            )
+    if not user.is_pro:
+        return redirect(
+            "/app/upgrade",
+            kind="error",
+            message="Esse módulo é exclusivo para usuários Premium.",
+        )
 
     messages = _generate_messages(nicho=nicho, cidade=cidade, servico=servico, mode=mode)
 
@@ -397,10 +361,10 @@ def invite_page(request: Request):
     flashes = pop_flashes(request)
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
     # ✅ agora lê contagem real dos cookies
     copy_count = _get_int_cookie(request, INVITE_COPY_COOKIE)
@@ -450,10 +414,10 @@ def cases_page(request: Request):
     flashes = pop_flashes(request)
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
     items: List[Dict] = []
 
@@ -474,20 +438,20 @@ def cases_admin_list(request: Request):
     flashes = pop_flashes(request)
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
-        if not _is_admin_user(user):
-            return _redirect_admin_denied()
+    if not _is_admin_user(user):
+        return _redirect_admin_denied()
 
-        # ✅ (B) busca do banco
-        items = list(
-            db.scalars(
-                select(Case).order_by(desc(Case.id))
-            ).all()
-        )
+    # ✅ (B) busca do banco
+    items = list(
+        db.scalars(
+            select(Case).order_by(desc(Case.id))
+        ).all()
+    )
 
     return templates.TemplateResponse(
         "cases/admin_list.html",
@@ -506,13 +470,13 @@ def cases_admin_new(request: Request):
     flashes = pop_flashes(request)
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
-        if not _is_admin_user(user):
-            return _redirect_admin_denied()
+    if not _is_admin_user(user):
+        return _redirect_admin_denied()
 
     return templates.TemplateResponse(
         "cases/admin_new.html",
@@ -536,23 +500,23 @@ def cases_admin_new_post(
 ):
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
-        if not _is_admin_user(user):
-            return _redirect_admin_denied()
-
-        # ✅ (C) salva no banco
-        item = Case(
-            name=(name or "").strip(),
-            city=(city or "").strip(),
-            service=(service or "").strip(),
-            value=(value or "").strip(),
-            phrase=(phrase or "").strip(),
-        )
-        db.add(item)
-        db.commit()
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
+    if not _is_admin_user(user):
+        return _redirect_admin_denied()
+
+    # ✅ (C) salva no banco
+    item = Case(
+        name=(name or "").strip(),
+        city=(city or "").strip(),
+        service=(service or "").strip(),
+        value=(value or "").strip(),
+        phrase=(phrase or "").strip(),
+    )
+    db.add(item)
+    db.commit()
 
     return RedirectResponse(url="/app/cases/admin", status_code=302)
 
@@ -563,16 +527,16 @@ def cases_export_one(request: Request, item_id: int):
     flashes = pop_flashes(request)
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
-        if not _is_admin_user(user):
-            return _redirect_admin_denied()
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
+    if not _is_admin_user(user):
+        return _redirect_admin_denied()
 
-        item = db.get(Case, item_id)
-        if not item:
-            raise HTTPException(status_code=404, detail="Não encontrado")
+    item = db.get(Case, item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Não encontrado")
 
     return templates.TemplateResponse(
         "cases/export.html",
@@ -593,17 +557,17 @@ def cases_admin_edit(request: Request, item_id: int):
     flashes = pop_flashes(request)
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
-        if not _is_admin_user(user):
-            return _redirect_admin_denied()
+    if not _is_admin_user(user):
+        return _redirect_admin_denied()
 
-        item = db.get(Case, item_id)
-        if not item:
-            raise HTTPException(status_code=404, detail="Não encontrado")
+    item = db.get(Case, item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Não encontrado")
 
     return templates.TemplateResponse(
         "cases/admin_edit.html",
@@ -631,25 +595,25 @@ def cases_admin_edit_post(
 ):
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
-        if not _is_admin_user(user):
-            return _redirect_admin_denied()
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
+    if not _is_admin_user(user):
+        return _redirect_admin_denied()
 
-        item = db.get(Case, item_id)
-        if not item:
-            raise HTTPException(status_code=404, detail="Não encontrado")
+    item = db.get(Case, item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Não encontrado")
 
-        item.name = (name or "").strip()
-        item.city = (city or "").strip()
-        item.service = (service or "").strip()
-        item.value = (value or "").strip()
-        item.phrase = (phrase or "").strip()
+    item.name = (name or "").strip()
+    item.city = (city or "").strip()
+    item.service = (service or "").strip()
+    item.value = (value or "").strip()
+    item.phrase = (phrase or "").strip()
 
-        db.add(item)
-        db.commit()
+    db.add(item)
+    db.commit()
 
     return RedirectResponse(url="/app/cases/admin", status_code=302)
 
@@ -659,17 +623,17 @@ def cases_admin_edit_post(
 def cases_admin_delete(request: Request, item_id: int):
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
-        if not _is_admin_user(user):
-            return _redirect_admin_denied()
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
+    if not _is_admin_user(user):
+        return _redirect_admin_denied()
 
-        item = db.get(Case, item_id)
-        if item:
-            db.delete(item)
-            db.commit()
+    item = db.get(Case, item_id)
+    if item:
+        db.delete(item)
+        db.commit()
 
     return RedirectResponse(url="/app/cases/admin", status_code=302)
 
@@ -690,17 +654,17 @@ def cases_export(request: Request):
     flashes = pop_flashes(request)
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
-        # ✅ evita template quebrar se ele espera lista/itens
+    # ✅ evita template quebrar se ele espera lista/itens
+    items = []
+    try:
+        items = list(db.scalars(select(Case).order_by(desc(Case.id))).all())
+    except Exception:
         items = []
-        try:
-            items = list(db.scalars(select(Case).order_by(desc(Case.id))).all())
-        except Exception:
-            items = []
 
     return templates.TemplateResponse(
         "cases/export.html",
@@ -719,10 +683,10 @@ def social_proof_page(request: Request):
     flashes = pop_flashes(request)
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
     return templates.TemplateResponse(
         "social_proof/social_proof.html",
@@ -748,10 +712,10 @@ def social_proof_generate(
     flashes = pop_flashes(request)
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
     servico_s = (servico or "").strip()
     valor_s = (valor or "").strip()
@@ -840,6 +804,64 @@ def _sp_text(payload: dict) -> str:
     )
 
 
+# ✅ carimbos de data dos exports: strftime só quando muda o minuto/segundo
+_FOOTER_CACHE: tuple[Optional[tuple], str] = (None, "")
+_FILENAME_CACHE: tuple[Optional[tuple], str] = (None, "")
+
+
+def _sp_footer_stamp(now: datetime) -> str:
+    global _FOOTER_CACHE
+    key = (now.year, now.month, now.day, now.hour, now.minute)
+    cached_key, text = _FOOTER_CACHE
+    if cached_key != key:
+        text = now.strftime("%d/%m/%Y %H:%M UTC")
+        _FOOTER_CACHE = (key, text)
+    return text
+
+
+def _sp_filename_stamp(now: datetime) -> str:
+    global _FILENAME_CACHE
+    key = (now.year, now.month, now.day, now.hour, now.minute, now.second)
+    cached_key, text = _FILENAME_CACHE
+    if cached_key != key:
+        text = now.strftime("%Y%m%d-%H%M%S")
+        _FILENAME_CACHE = (key, text)
+    return text
+
+
+@lru_cache(maxsize=1)
+def _sp_pdf_kit() -> Dict[str, Any]:
+    """
+    Parte fixa do PDF de prova social (imports, cores e geometria do card).
+    Resolvida uma vez por processo; por request só sobra desenhar o texto.
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+
+    width, height = A4
+    margin = 54
+    card_x = margin
+    card_y = margin + 36
+    card_w = width - (margin * 2)
+    card_h = height - (margin * 2) - 36
+
+    return {
+        "canvas": canvas,
+        "pagesize": A4,
+        "width": width,
+        "height": height,
+        "card": (card_x, card_y, card_w, card_h),
+        "white": colors.white,
+        "border": colors.HexColor("#E5E7EB"),
+        "title": colors.HexColor("#0F172A"),
+        "muted": colors.HexColor("#475569"),
+        "sep": colors.HexColor("#EEF2F7"),
+        "label": colors.HexColor("#334155"),
+        "footer": colors.HexColor("#94A3B8"),
+    }
+
+
 @router.get("/social-proof/pdf")
 @router.post("/social-proof/pdf")
 def social_proof_pdf(
@@ -851,54 +873,47 @@ def social_proof_pdf(
 ):
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
-        if not user.is_pro:
-            return redirect("/app/upgrade", kind="error", message="Exportação PDF é Premium.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
+    if not user.is_pro:
+        return redirect("/app/upgrade", kind="error", message="Exportação PDF é Premium.")
 
     payload = _sp_get_payload(request, servico, valor, cidade, detalhe)
 
     try:
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib import colors
+        kit = _sp_pdf_kit()
     except Exception:
         raise HTTPException(status_code=500, detail="Biblioteca de PDF não instalada (reportlab).")
 
     now = datetime.now(timezone.utc)
-    filename = f'prova-social-{now.strftime("%Y%m%d-%H%M%S")}.pdf'
+    filename = f"prova-social-{_sp_filename_stamp(now)}.pdf"
 
     buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    width, height = A4
+    c = kit["canvas"].Canvas(buf, pagesize=kit["pagesize"])
+    width, height = kit["width"], kit["height"]
+    card_x, card_y, card_w, card_h = kit["card"]
 
-    margin = 54
-    card_x = margin
-    card_y = margin + 36
-    card_w = width - (margin * 2)
-    card_h = height - (margin * 2) - 36
-
-    c.setFillColor(colors.white)
+    c.setFillColor(kit["white"])
     c.rect(0, 0, width, height, stroke=0, fill=1)
 
-    c.setFillColor(colors.white)
-    c.setStrokeColor(colors.HexColor("#E5E7EB"))
+    c.setFillColor(kit["white"])
+    c.setStrokeColor(kit["border"])
     c.setLineWidth(1)
     c.roundRect(card_x, card_y, card_w, card_h, radius=14, stroke=1, fill=1)
 
     title_y = card_y + card_h - 54
-    c.setFillColor(colors.HexColor("#0F172A"))
+    c.setFillColor(kit["title"])
     c.setFont("Helvetica-Bold", 26)
     c.drawString(card_x + 28, title_y, "Prova Social")
 
-    c.setFillColor(colors.HexColor("#475569"))
+    c.setFillColor(kit["muted"])
     c.setFont("Helvetica", 12)
     c.drawString(card_x + 28, title_y - 22, "Depoimento pronto para postar")
 
     sep_y = title_y - 36
-    c.setStrokeColor(colors.HexColor("#EEF2F7"))
+    c.setStrokeColor(kit["sep"])
     c.setLineWidth(1)
     c.line(card_x + 24, sep_y, card_x + card_w - 24, sep_y)
 
@@ -909,11 +924,11 @@ def social_proof_pdf(
     def draw_row(label: str, value: str, y_pos: float) -> float:
         if not value:
             return y_pos
-        c.setFillColor(colors.HexColor("#334155"))
+        c.setFillColor(kit["label"])
         c.setFont("Helvetica-Bold", 12)
         c.drawString(label_x, y_pos, label)
 
-        c.setFillColor(colors.HexColor("#0F172A"))
+        c.setFillColor(kit["title"])
         c.setFont("Helvetica", 12)
         max_w = (card_x + card_w - 28) - value_x
         words = value.split()
@@ -946,17 +961,17 @@ def social_proof_pdf(
     y = draw_row("Detalhe:", payload.get("detalhe", ""), y)
 
     if not (payload.get("servico") or payload.get("valor") or payload.get("cidade") or payload.get("detalhe")):
-        c.setFillColor(colors.HexColor("#0F172A"))
+        c.setFillColor(kit["title"])
         c.setFont("Helvetica-Bold", 16)
         c.drawString(card_x + 28, sep_y - 64, "Prova social vazia")
-        c.setFillColor(colors.HexColor("#475569"))
+        c.setFillColor(kit["muted"])
         c.setFont("Helvetica", 12)
         c.drawString(card_x + 28, sep_y - 86, "Preencha os campos antes de exportar.")
 
     footer_y = card_y + 18
-    c.setFillColor(colors.HexColor("#94A3B8"))
+    c.setFillColor(kit["footer"])
     c.setFont("Helvetica", 9)
-    c.drawString(card_x + 24, footer_y, f"Gerado em {now.strftime('%d/%m/%Y %H:%M UTC')}")
+    c.drawString(card_x + 24, footer_y, f"Gerado em {_sp_footer_stamp(now)}")
     c.drawRightString(card_x + card_w - 24, footer_y, "Fecha Instalação")
 
     c.showPage()
@@ -978,12 +993,12 @@ def social_proof_ppt(
 ):
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
-        if not user.is_pro:
-            return redirect("/app/upgrade", kind="error", message="Exportação PPT é Premium.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
+    if not user.is_pro:
+        return redirect("/app/upgrade", kind="error", message="Exportação PPT é Premium.")
 
     payload = _sp_get_payload(request, servico, valor, cidade, detalhe)
 
@@ -996,7 +1011,7 @@ def social_proof_ppt(
         raise HTTPException(status_code=500, detail="Biblioteca de PPT não instalada (python-pptx).")
 
     now = datetime.now(timezone.utc)
-    filename = f'prova-social-{now.strftime("%Y%m%d-%H%M%S")}.pptx'
+    filename = f"prova-social-{_sp_filename_stamp(now)}.pptx"
 
     prs = Presentation()
     slide = prs.slides.add_slide(prs.slide_layouts[6])
@@ -1073,7 +1088,7 @@ def social_proof_ppt(
     ft = footer.text_frame
     ft.clear()
     fp = ft.paragraphs[0]
-    fp.text = f"Gerado em {now.strftime('%d/%m/%Y %H:%M UTC')}  •  Fecha Instalação"
+    fp.text = f"Gerado em {_sp_footer_stamp(now)}  •  Fecha Instalação"
     fp.font.size = Pt(12)
     fp.font.color.rgb = RGBColor(148, 163, 184)
     fp.alignment = PP_ALIGN.LEFT
@@ -1095,19 +1110,19 @@ def budgets_new_page(request: Request):
     flashes = pop_flashes(request)
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
-        budgets = list(
-            db.scalars(select(Budget).where(Budget.user_id == uid)).all()
-        )
+    budgets = list(
+        db.scalars(select(Budget).where(Budget.user_id == uid)).all()
+    )
 
-        total = len(budgets)
-        remaining = None
-        if not user.is_pro:
-            remaining = max(0, FREE_LIMIT_TOTAL_BUDGETS - total)
+    total = len(budgets)
+    remaining = None
+    if not user.is_pro:
+        remaining = max(0, FREE_LIMIT_TOTAL_BUDGETS - total)
 
     return templates.TemplateResponse(
         "budget_new.html",
@@ -1145,54 +1160,68 @@ def budgets_new_post(
 
     final_service_type = service_type or service
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
-
-        if not can_create_budget(db, user):
-            return redirect("/app/upgrade", kind="error", message="Você atingiu o limite do plano gratuito.")
-
-        create_budget(
-            db=db,
-            user_id=uid,
-            client_name=client_name,
-            phone=phone,
-            service_type=final_service_type,
-            value=value,
-            payment_method=payment_method,
-            notes=notes,
-        )
+    db = db_session()
+    user = db.get(User, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
+
+    if not can_create_budget(db, user):
+        return redirect("/app/upgrade", kind="error", message="Você atingiu o limite do plano gratuito.")
+
+    create_budget(
+        db=db,
+        user_id=uid,
+        client_name=client_name,
+        phone=phone,
+        service_type=final_service_type,
+        value=value,
+        payment_method=payment_method,
+        notes=notes,
+    )
+    invalidate_user_caches(uid)
 
-    return redirect("/app", kind="success", message="Orçamento criado com sucesso!")
+    resp = redirect("/app", kind="success", message="Orçamento criado com sucesso!")
+    mark_counts_fresh(resp)
+    return resp
 
 
 @router.get("/budgets/{budget_id}/whatsapp")
 def budgets_whatsapp(request: Request, budget_id: int):
     uid = _require_user(request)
 
-    with SessionLocal() as db:
-        budget = db.scalar(
-            select(Budget).where(Budget.id == budget_id, Budget.user_id == uid)
-        )
-        if not budget:
-            raise HTTPException(status_code=404, detail="Não encontrado")
-
-        phone = (budget.phone or "").strip()
-        if not phone:
-            return redirect("/app", kind="error", message="Esse orçamento não tem telefone cadastrado.")
-
-        # ✅ ÚNICA MUDANÇA: usa o modelo UAU (app/services/whatsapp.py)
-        msg = build_budget_message(
-            client_name=(budget.client_name or "").strip(),
-            service_type=(budget.service_type or "").strip(),
-            value=(budget.value or "").strip(),
-            payment_method=(budget.payment_method or "").strip(),
-            notes=(budget.notes or "").strip(),
-        )
+    db = db_session()
+    # só as colunas usadas na mensagem (sem montar o objeto ORM)
+    row = db.execute(
+        select(
+            Budget.client_name,
+            Budget.service_type,
+            Budget.value,
+            Budget.payment_method,
+            Budget.notes,
+            Budget.phone,
+        ).where(Budget.id == budget_id, Budget.user_id == uid)
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Não encontrado")
+
+    client_name, service_type, value, payment_method, notes, phone = row
+
+    phone = (phone or "").strip()
+    if not phone:
+        return redirect("/app", kind="error", message="Esse orçamento não tem telefone cadastrado.")
+
+    # ✅ ÚNICA MUDANÇA: usa o modelo UAU (app/services/whatsapp.py)
+    # (build_budget_message já faz None -> "" e strip em cada campo)
+    msg = build_budget_message(
+        client_name=client_name,
+        service_type=service_type,
+        value=value,
+        payment_method=payment_method,
+        notes=notes,
+    )
 
-        url = whatsapp_link(phone, msg)
-        return RedirectResponse(url=url, status_code=302)
+    url = whatsapp_link(phone, msg)
+    return RedirectResponse(url=url, status_code=302)
 
 
 @router.post("/budgets/{budget_id}/status")
@@ -1202,31 +1231,24 @@ def budgets_status_post(
     status: str = Form(""),
 ):
     uid = _require_user(request)
-    status_s = (status or "").strip().lower()
-
-    mapping = {
-        "awaiting": "awaiting",
-        "aguardando": "awaiting",
-        "pendente": "awaiting",
-        "won": "won",
-        "fechado": "won",
-        "lost": "lost",
-        "perdido": "lost",
-    }
 
-    status_db = mapping.get(status_s)
-    if not status_db:
+    # mesma tabela de aliases do model (Budget._normalize_status)
+    status_db = normalize_status(status)
+    if status_db not in BUDGET_STATUSES:
         return redirect("/app", kind="error", message="Status inválido.")
 
-    with SessionLocal() as db:
-        budget = db.scalar(
-            select(Budget).where(Budget.id == budget_id, Budget.user_id == uid)
-        )
-        if not budget:
-            raise HTTPException(status_code=404, detail="Não encontrado")
+    db = db_session()
+    budget = db.scalar(
+        select(Budget).where(Budget.id == budget_id, Budget.user_id == uid)
+    )
+    if not budget:
+        raise HTTPException(status_code=404, detail="Não encontrado")
 
-        budget.status = status_db
-        db.add(budget)
-        db.commit()
+    budget.status = status_db
+    db.add(budget)
+    db.commit()
+    invalidate_user_caches(uid)
 
-    return RedirectResponse(url="/app", status_code=303)
\ No newline at end of file
+    resp = RedirectResponse(url="/app", status_code=303)
+    mark_counts_fresh(resp)
+    return resp
\ No newline at end of file
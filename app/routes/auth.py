@@ -4,15 +4,14 @@ from typing import Optional
 
 from fastapi import APIRouter, Form, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.exc import IntegrityError
 
 from app.core.deps import clear_session, redirect, set_session
+from app.core.templates import templates
 from app.core.security import verify_password, hash_password
 from app.db.session import SessionLocal
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 # Campos possíveis de senha no seu User
 PASSWORD_FIELDS = ("password_hash", "hashed_password", "senha_hash", "password", "senha")
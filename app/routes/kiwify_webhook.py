@@ -3,17 +3,24 @@ from __future__ import annotations
 import os
 import hmac
 import hashlib
+from functools import lru_cache
 from typing import Any, Optional
 
-from fastapi import APIRouter, Request, Header
-from fastapi.responses import JSONResponse
+import orjson
+from fastapi import APIRouter, Depends, Request, Header
+from fastapi.responses import Response
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import SessionLocal
+from app.core.deps import get_db
 from app.models.user import User
+from app.services.cache import invalidate_user_caches
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
 
+# Payload da Kiwify é pequeno; acima disso recusa sem bufferizar tudo
+MAX_WEBHOOK_BODY = 1_000_000
+
 
 def _get_signature_from_headers(headers: dict[str, str]) -> str:
     # Tenta vários nomes comuns (a Kiwify pode variar por produto/conta/config)
@@ -36,11 +43,20 @@ def _normalize_sig(sig: str) -> str:
     return sig.strip()
 
 
-def _verify_signature(raw_body: bytes, secret: str, header_sig: str) -> bool:
-    if not secret:
+def _json(content: dict[str, Any], status_code: int = 200) -> Response:
+    return Response(orjson.dumps(content), status_code=status_code, media_type="application/json")
+
+
+@lru_cache(maxsize=8)
+def _hmac_template(secret: str) -> "hmac.HMAC":
+    # chave já processada; cada request usa um .copy()
+    return hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+
+def _verify_signature(mac: Optional["hmac.HMAC"], header_sig: str) -> bool:
+    if mac is None:
         return False
-    expected = hmac.new(secret.encode("utf-8"), raw_body, hashlib.sha256).hexdigest()
-    return hmac.compare_digest(expected, _normalize_sig(header_sig))
+    return hmac.compare_digest(mac.hexdigest(), _normalize_sig(header_sig))
 
 
 def _extract_email(payload: dict[str, Any]) -> Optional[str]:
@@ -96,7 +112,7 @@ def _status_to_pro(status: str) -> Optional[bool]:
 
 
 @router.post("/kiwify")
-async def kiwify_webhook(request: Request):
+async def kiwify_webhook(request: Request, db: AsyncSession = Depends(get_db)):
     """
     Webhook da Kiwify.
     1) Valida assinatura (HMAC SHA256) usando KIWIFY_WEBHOOK_SECRET
@@ -106,39 +122,55 @@ async def kiwify_webhook(request: Request):
     secret = (os.getenv("KIWIFY_WEBHOOK_SECRET") or "").strip()
     allow_unsigned = (os.getenv("KIWIFY_ALLOW_UNSIGNED_WEBHOOKS") or "").strip() == "1"
 
-    raw = await request.body()
     headers = {k.lower(): v for k, v in request.headers.items()}
     header_sig = _get_signature_from_headers(headers)
 
+    try:
+        declared = int(headers.get("content-length") or 0)
+    except ValueError:
+        declared = 0
+    if declared > MAX_WEBHOOK_BODY:
+        return _json({"ok": False, "error": "payload_too_large"}, status_code=413)
+
+    # lê o corpo em pedaços: HMAC calculado junto com a leitura e memória limitada
+    mac = _hmac_template(secret).copy() if secret else None
+    raw = bytearray()
+    async for chunk in request.stream():
+        raw.extend(chunk)
+        if len(raw) > MAX_WEBHOOK_BODY:
+            return _json({"ok": False, "error": "payload_too_large"}, status_code=413)
+        if mac is not None:
+            mac.update(chunk)
+
     if not allow_unsigned:
         if not header_sig:
-            return JSONResponse({"ok": False, "error": "missing_signature"}, status_code=401)
-        if not _verify_signature(raw, secret, header_sig):
-            return JSONResponse({"ok": False, "error": "invalid_signature"}, status_code=401)
+            return _json({"ok": False, "error": "missing_signature"}, status_code=401)
+        if not _verify_signature(mac, header_sig):
+            return _json({"ok": False, "error": "invalid_signature"}, status_code=401)
 
     try:
-        payload = await request.json()
+        payload = orjson.loads(raw)
     except Exception:
-        return JSONResponse({"ok": False, "error": "invalid_json"}, status_code=400)
+        return _json({"ok": False, "error": "invalid_json"}, status_code=400)
 
     email = _extract_email(payload)
     status = _extract_status(payload)
     decision = _status_to_pro(status)
 
     if not email:
-        return JSONResponse({"ok": False, "error": "missing_email"}, status_code=400)
+        return _json({"ok": False, "error": "missing_email"}, status_code=400)
 
     # Se não reconheceu o status, só aceita e não altera nada
     if decision is None:
-        return JSONResponse({"ok": True, "message": "event_ignored", "email": email, "status": status})
+        return _json({"ok": True, "message": "event_ignored", "email": email, "status": status})
 
-    with SessionLocal() as db:
-        user = db.scalar(select(User).where(User.email == email))
-        if not user:
-            # comprador não tem conta no app (ou email diferente do cadastro)
-            return JSONResponse({"ok": True, "message": "user_not_found", "email": email, "status": status})
+    user = await db.scalar(select(User).where(User.email == email))
+    if not user:
+        # comprador não tem conta no app (ou email diferente do cadastro)
+        return _json({"ok": True, "message": "user_not_found", "email": email, "status": status})
 
-        user.is_pro = bool(decision)
-        db.commit()
+    user.is_pro = bool(decision)
+    await db.commit()
+    invalidate_user_caches(user.id)
 
-    return JSONResponse({"ok": True, "email": email, "status": status, "is_pro": bool(decision)})
+    return _json({"ok": True, "email": email, "status": status, "is_pro": bool(decision)})
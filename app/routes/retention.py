@@ -1,76 +1,73 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
-from typing import Dict
+from typing import Dict, Optional
 
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, desc
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps import get_user_id_from_request
-from app.db.session import SessionLocal
-from app.models.user import User
+from app.core.deps import FRESH_COUNTS_COOKIE, get_db, get_user_id_int, load_page_user
+from app.core.templates import templates
 from app.models.budget import Budget
+from app.services.cache import cache_get, cache_set, retention_cache
 
 router = APIRouter(prefix="/app")
-templates = Jinja2Templates(directory="app/templates")
 
 
 def _require_user_id(request: Request) -> int:
-    uid_raw = get_user_id_from_request(request)
-    if not uid_raw:
+    uid = get_user_id_int(request)
+    if not uid:
         raise HTTPException(status_code=401)
-    try:
-        return int(uid_raw)
-    except (TypeError, ValueError):
-        raise HTTPException(status_code=401)
-
-
-def _status_norm(s: str | None) -> str:
-    return (s or "").strip().lower()
+    return uid
 
 
 def _fmt_br(dt: datetime) -> str:
-    return dt.astimezone(timezone.utc).strftime("%d/%m/%Y")
+    # start/now já chegam em UTC: sem astimezone nem strftime
+    return f"{dt.day:02d}/{dt.month:02d}/{dt.year}"
 
 
 @router.get("/retention", response_class=HTMLResponse)
-def retention_page(request: Request):
+async def retention_page(request: Request, db: AsyncSession = Depends(get_db)):
     uid = _require_user_id(request)
 
     now = datetime.now(timezone.utc)
     start = now - timedelta(days=7)
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return RedirectResponse(url="/login", status_code=302)
-
-        budgets = list(
-            db.scalars(
-                select(Budget)
-                .where(Budget.user_id == uid)
-                .order_by(desc(Budget.created_at), desc(Budget.id))
-            ).all()
-        )
-
-    # janela semanal
-    week_budgets = []
-    for b in budgets:
-        if not b.created_at:
-            continue
-        dt = b.created_at.replace(tzinfo=timezone.utc)
-        if start <= dt <= now:
-            week_budgets.append(b)
-
-    created_count = len(week_budgets)
-
-    won = [b for b in week_budgets if _status_norm(getattr(b, "status", None)) == "won"]
-    lost = [b for b in week_budgets if _status_norm(getattr(b, "status", None)) == "lost"]
-    awaiting = [b for b in week_budgets if _status_norm(getattr(b, "status", None)) == "awaiting"]
-
-    closed_count = len(won)  # “fechado” = won
+    user = await load_page_user(db, uid)
+    if not user:
+        return RedirectResponse(url="/login", status_code=302)
+
+    # ✅ contagem da semana em cache por usuário (60s; invalidado ao criar/alterar orçamento).
+    # Logo depois de uma escrita (cookie fresh_counts) vai direto ao banco: o cache
+    # deste worker pode ser de antes da escrita feita em outro.
+    counts: Optional[Dict[str, int]] = None
+    if FRESH_COUNTS_COOKIE not in request.cookies:
+        counts = cache_get(retention_cache, uid)
+    if counts is None:
+        # janela semanal + contagem por status em uma query só (o banco devolve ~3 linhas)
+        # (status já é gravado normalizado: ver Budget._normalize_status)
+        rows = (
+            await db.execute(
+                select(Budget.status, func.count())
+                .where(
+                    Budget.user_id == uid,
+                    Budget.created_at >= start,
+                    Budget.created_at <= now,
+                )
+                .group_by(Budget.status)
+            )
+        ).all()
+        counts = {status: n for status, n in rows}
+        cache_set(retention_cache, uid, counts)
+
+    created_count = sum(counts.values())
+    won_count = counts.get("won", 0)
+    lost_count = counts.get("lost", 0)
+    awaiting_count = counts.get("awaiting", 0)
+
+    closed_count = won_count  # “fechado” = won
 
     conversion = (closed_count / created_count * 100.0) if created_count > 0 else 0.0
     conversion_pct = round(conversion, 1)  # ✅ já arredonda aqui
@@ -78,9 +75,9 @@ def retention_page(request: Request):
     report_text = (
         f"📊 RELATÓRIO SEMANAL — {_fmt_br(start)} a {_fmt_br(now)}\n\n"
         f"✅ Orçamentos criados: {created_count}\n"
-        f"🟢 Fechados: {len(won)}\n"
-        f"🟡 Aguardando: {len(awaiting)}\n"
-        f"🔴 Perdidos: {len(lost)}\n"
+        f"🟢 Fechados: {won_count}\n"
+        f"🟡 Aguardando: {awaiting_count}\n"
+        f"🔴 Perdidos: {lost_count}\n"
         f"📈 Taxa de conversão: {conversion_pct:.1f}%\n\n"
         f"🎯 Ação simples (pra subir a conversão):\n"
         f"- Faça 1 follow-up em todos os “Aguardando” (em até 24h).\n"
@@ -94,8 +91,8 @@ def retention_page(request: Request):
         "start": start,
         "created_count": created_count,
         "closed_count": closed_count,
-        "awaiting_count": len(awaiting),
-        "lost_count": len(lost),
+        "awaiting_count": awaiting_count,
+        "lost_count": lost_count,
         "conversion_pct": conversion_pct,  # ✅ use isso no template
         "report_text": report_text,
     }
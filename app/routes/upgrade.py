@@ -1,20 +1,22 @@
 from __future__ import annotations
 
 import os
+from functools import lru_cache
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.deps import get_user_id_from_request, redirect, pop_flashes
-from app.db.session import SessionLocal
+from app.core.deps import get_db, get_user_id_int, load_page_user, redirect, pop_flashes
+from app.core.templates import templates
 from app.models.user import User
 
 router = APIRouter(prefix="/app")
-templates = Jinja2Templates(directory="app/templates")
 
 
+@lru_cache(maxsize=1)  # env não muda com o processo rodando
 def _get_checkout_url() -> str:
     # ✅ Não quebra se o Settings não tiver o atributo
     url = (getattr(settings, "KIWIFY_CHECKOUT_URL", None) or "").strip()
@@ -25,16 +27,16 @@ def _get_checkout_url() -> str:
 
 
 @router.get("/upgrade", response_class=HTMLResponse)
-def upgrade_page(request: Request):
+async def upgrade_page(request: Request, db: AsyncSession = Depends(get_db)):
     flashes = pop_flashes(request)
-    uid = get_user_id_from_request(request)
+    uid = get_user_id_int(request)
     if not uid:
         return redirect("/login", kind="error", message="Faça login para virar Pro.")
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    # a página só lê is_pro/email: não traz password_hash/created_at
+    user = await load_page_user(db, uid)
+    if not user:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
     checkout_url = _get_checkout_url()
 
@@ -50,15 +52,15 @@ def upgrade_page(request: Request):
 
 
 @router.get("/checkout")
-def checkout(request: Request):
-    uid = get_user_id_from_request(request)
+async def checkout(request: Request, db: AsyncSession = Depends(get_db)):
+    uid = get_user_id_int(request)
     if not uid:
         return redirect("/login", kind="error", message="Faça login para assinar o Premium.")
 
-    with SessionLocal() as db:
-        user = db.get(User, uid)
-        if not user:
-            return redirect("/login", kind="error", message="Faça login novamente.")
+    # só confere se o usuário existe: busca apenas o id
+    user_id = await db.scalar(select(User.id).where(User.id == uid))
+    if not user_id:
+        return redirect("/login", kind="error", message="Faça login novamente.")
 
     checkout_url = _get_checkout_url()
     if not checkout_url:
@@ -1,15 +1,32 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Request
-from fastapi.responses import JSONResponse
+import hmac
+import re
+from functools import lru_cache
+
+import orjson
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import ORJSONResponse
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.core.deps import get_db
 from app.models.user import User
+from app.services.cache import invalidate_user_caches
 
 router = APIRouter(prefix="/webhook")
 
+# Critério de "pago": qualquer uma dessas palavras dentro do status (uma passada só)
+_PAID_RE = re.compile(r"paid|approved|aprovado|pago|completed|success")
+
+
+@lru_cache(maxsize=1)
+def _expected_secret() -> bytes:
+    # lido uma vez: o secret vem do ambiente e não muda em runtime
+    # (em bytes: compare_digest com str recusa caracteres não-ASCII)
+    return (settings.KIWIFY_WEBHOOK_SECRET or "").strip().encode("utf-8")
+
 
 def _get_secret_from_request(request: Request) -> str:
     # 1) Query string: /webhook/kiwify?secret=XXXX
@@ -26,21 +43,28 @@ def _get_secret_from_request(request: Request) -> str:
 
 
 @router.post("/kiwify")
-async def kiwify_webhook(request: Request):
+async def kiwify_webhook(request: Request, db: AsyncSession = Depends(get_db)):
     # Segurança: valida secret
     received = _get_secret_from_request(request)
-    expected = (settings.KIWIFY_WEBHOOK_SECRET or "").strip()
+    expected = _expected_secret()
 
     if not expected:
-        return JSONResponse(
+        return ORJSONResponse(
             {"ok": False, "error": "KIWIFY_WEBHOOK_SECRET não configurado no .env"},
             status_code=500,
         )
 
-    if not received or received != expected:
-        return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+    # comparação em tempo constante (não vaza o secret por timing)
+    if not received or not hmac.compare_digest(received.encode("utf-8"), expected):
+        return ORJSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
 
-    payload = await request.json()
+    # orjson (C/Rust) em vez do json da stdlib que o request.json() usa
+    try:
+        payload = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        payload = None
+    if not isinstance(payload, dict):
+        return ORJSONResponse({"ok": False, "error": "invalid_json"}, status_code=400)
 
     # Kiwify costuma mandar buyer email em algum campo.
     # A gente tenta achar o email em vários lugares comuns:
@@ -63,21 +87,20 @@ async def kiwify_webhook(request: Request):
 
     # Se não tiver email, não tem como ativar
     if not email:
-        return JSONResponse({"ok": True, "ignored": True, "reason": "missing_email"}, status_code=200)
+        return ORJSONResponse({"ok": True, "ignored": True, "reason": "missing_email"}, status_code=200)
 
     # Critério: ativar Pro quando status indica aprovado/pago
-    paid_keywords = {"paid", "approved", "aprovado", "pago", "completed", "success"}
-    is_paid = any(k in status for k in paid_keywords) if status else True  # se não vier status, assume true
+    is_paid = bool(_PAID_RE.search(status)) if status else True  # se não vier status, assume true
 
     if not is_paid:
-        return JSONResponse({"ok": True, "ignored": True, "reason": f"not_paid:{status}"}, status_code=200)
+        return ORJSONResponse({"ok": True, "ignored": True, "reason": f"not_paid:{status}"}, status_code=200)
 
-    with SessionLocal() as db:
-        user = db.scalar(select(User).where(User.email == email))
-        if not user:
-            return JSONResponse({"ok": True, "ignored": True, "reason": "user_not_found"}, status_code=200)
+    user = await db.scalar(select(User).where(User.email == email))
+    if not user:
+        return ORJSONResponse({"ok": True, "ignored": True, "reason": "user_not_found"}, status_code=200)
 
-        user.is_pro = True
-        db.commit()
+    user.is_pro = True
+    await db.commit()
+    invalidate_user_caches(user.id)
 
-    return JSONResponse({"ok": True, "pro_activated_for": email}, status_code=200)
+    return ORJSONResponse({"ok": True, "pro_activated_for": email}, status_code=200)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.models.budget import Budget
@@ -10,13 +10,18 @@ from app.models.user import User
 FREE_LIMIT_TOTAL_BUDGETS = 10
 
 
-def can_create_budget(db: Session, user: User) -> tuple[bool, int]:
+def can_create_budget(db: Session, user: User) -> bool:
     if user.is_pro:
-        return True, -1
-    total = db.scalar(select(func.count(Budget.id)).where(Budget.user_id == user.id)) or 0
-    if total >= FREE_LIMIT_TOTAL_BUDGETS:
-        return False, total
-    return True, total
+        return True
+    # só interessa se existe o 10º orçamento: para no limite em vez de contar tudo
+    at_limit = db.scalar(
+        select(1)
+        .select_from(Budget)
+        .where(Budget.user_id == user.id)
+        .offset(FREE_LIMIT_TOTAL_BUDGETS - 1)
+        .limit(1)
+    )
+    return at_limit is None
 
 
 def create_budget(
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict
+
+from cachetools import TTLCache
+
+# Cache em memória do processo (não tem Redis no deploy).
+# Sempre com chave por user_id: nunca compartilhar dado entre usuários.
+# Cada worker tem o seu; o TTL curto limita o tempo de dado velho em outro worker.
+
+# user_id -> {status: quantidade} da janela semanal da retenção
+# ⚠️ Por worker: invalidate_user_caches() só limpa o worker que atendeu a escrita; nos
+# outros a contagem velha duraria até o TTL. Por isso, depois de criar/alterar orçamento,
+# o navegador recebe o cookie de mark_counts_fresh() (deps) e a retenção ignora o cache
+# enquanto ele existir (mesmo TTL).
+RETENTION_TTL = 60
+retention_cache: "TTLCache[int, Dict[str, int]]" = TTLCache(maxsize=10_000, ttl=RETENTION_TTL)
+
+# user_id -> PremiumGateInfo (banner/limite do Free; roda em todo /app/*)
+gate_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+
+_lock = threading.Lock()  # TTLCache não é thread-safe (rotas sync rodam no threadpool)
+
+
+def cache_get(cache: TTLCache, key):
+    with _lock:
+        return cache.get(key)
+
+
+def cache_set(cache: TTLCache, key, value) -> None:
+    with _lock:
+        cache[key] = value
+
+
+def invalidate_user_caches(user_id: int) -> None:
+    """Chamar depois de criar/alterar orçamento do usuário ou mudar o plano."""
+    with _lock:
+        retention_cache.pop(user_id, None)
+        gate_cache.pop(user_id, None)
@@ -1,11 +1,30 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+from functools import lru_cache
 from urllib.parse import quote
 
 
+class _DigitsOnly(dict):
+    """
+    Tabela para str.translate: mantém o que é dígito (mesmo critério do
+    str.isdigit) e remove o resto. Latin-1 (o que um telefone digitado
+    tem na prática) já vem decidido; fora disso decide na hora sem guardar,
+    para o tamanho não crescer com o que o usuário digitar.
+    """
+
+    def __init__(self) -> None:
+        super().__init__((cp, cp if chr(cp).isdigit() else None) for cp in range(0x100))
+
+    def __missing__(self, codepoint: int):
+        return codepoint if chr(codepoint).isdigit() else None
+
+
+_DIGITS_ONLY = _DigitsOnly()
+
+
 def normalize_phone_br(phone: str) -> str:
-    digits = "".join(ch for ch in phone if ch.isdigit())
+    digits = phone.translate(_DIGITS_ONLY)
     if digits.startswith("55"):
         return digits
     if len(digits) >= 10:
@@ -55,12 +74,18 @@ def build_budget_message(
     return message
 
 
+# mensagem é determinística pelos campos do orçamento: reenvio/refresh não re-escaneia
+@lru_cache(maxsize=2048)
+def _encode(msg: str) -> str:
+    # força UTF-8 corretamente
+    return quote(msg, safe="", encoding="utf-8", errors="strict")
+
+
 def whatsapp_link(phone: str, message: str) -> str:
     p = normalize_phone_br(phone)
     msg = _clean_text(message)
 
-    # força UTF-8 corretamente
-    encoded = quote(msg, safe="", encoding="utf-8", errors="strict")
+    encoded = _encode(msg)
     return f"https://wa.me/{p}?text={encoded}"
 
 
@@ -1,14 +1,24 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-
+import asyncio
+import gzip
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import orjson
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 
-from app.db.session import init_db
-from app.core.deps import FLASH_COOKIE, pop_flashes
+from app.db.session import async_engine, engine, init_db_async
+from app.core.deps import pop_flashes
+from app.core.middleware import DBSessionMiddleware, FlashClearMiddleware
+from app.core.staticfiles import CachedStaticFiles
+from app.core.templates import templates
 from app.routes.auth import router as auth_router
 from app.routes.app import router as app_router
 from app.routes.webhook import router as webhook_router
@@ -19,113 +29,187 @@ from app.routes import retention
 # ✅ CORRIGIDO: incluir router do upgrade (checkout fica aqui)
 from app.routes.upgrade import router as upgrade_router
 
-# ✅ CORRIGIDO: incluir router do onboarding (módulo)
-from app.modules.onboarding.router import router as onboarding_router
+logger = logging.getLogger(__name__)
 
 
-app = FastAPI(title="FECHA INSTALAÇÃO", version="0.1.0")
-print(">>> MAIN.PY LOADED (with premium_gate + modules)")
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # boot em paralelo: schema no banco, templates compilados e módulos opcionais
+    await asyncio.gather(
+        init_db_async(),
+        asyncio.to_thread(_warm_templates),
+        asyncio.to_thread(_register_modules),
+    )
+    yield
+    # shutdown: devolve as conexões dos dois pools
+    await async_engine.dispose()
+    engine.dispose()
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
 
+# Em produção (APP_ENV=production) sem /openapi.json e /docs: o schema nunca é montado
+_IS_PROD = (os.getenv("APP_ENV") or "").strip().lower() == "production"
 
-@app.on_event("startup")
-def _startup() -> None:
-    init_db()
+# rotas que devolvem dict/list serializam com orjson (bytes direto)
+app = FastAPI(
+    title="FECHA INSTALAÇÃO",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+    openapi_url=None if _IS_PROD else "/openapi.json",
+)
+logger.info("main loaded (premium_gate + modules)")
 
+app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
 
-@app.middleware("http")
-async def flash_middleware(request: Request, call_next):
-    response = await call_next(request)
 
-    if getattr(request.state, "clear_flashes", False):
-        response.delete_cookie(key=FLASH_COOKIE, path="/")
+# Templates das páginas mais acessadas: compilados no boot, não no 1º request
+_HOT_TEMPLATES = (
+    "landing.html",
+    "dashboard.html",
+    "upgrade.html",
+    "retention/retention.html",
+    "premium_gate/limit.html",
+)
 
-    return response
+# landing fixo: sem lookup no loader a cada GET /
+LANDING_TMPL = templates.get_template("landing.html")
 
+# Sem flashes o landing é sempre igual (o template não usa request): renderizado
+# e comprimido uma vez só. Com JINJA_AUTO_RELOAD=1 (dev) fica no render normal.
+if templates.env.auto_reload:
+    LANDING_HTML_BYTES = LANDING_HTML_GZ = None
+else:
+    LANDING_HTML_BYTES = LANDING_TMPL.render(
+        request=None,
+        flashes=[],
+        product_name="FECHA INSTALAÇÃO",
+    ).encode("utf-8")
+    LANDING_HTML_GZ = gzip.compress(LANDING_HTML_BYTES, 6)
 
-# ✅ PREMIUM GATE MIDDLEWARE (banner + bloqueio no limite) — isolado e seguro (fail-open)
-try:
-    from app.core.deps import get_user_id_from_request
-    from app.modules.premium_gate.services import get_gate_info, render_banner_html
-    from jinja2 import ChoiceLoader, FileSystemLoader
 
-    premium_templates = Jinja2Templates(directory="app/templates")
-    premium_templates.env.loader = ChoiceLoader([  # type: ignore[attr-defined]
-        premium_templates.env.loader,
-        FileSystemLoader("app/modules/premium_gate/templates"),
-    ])
+def _warm_templates() -> None:
+    for name in _HOT_TEMPLATES:
+        templates.get_template(name)
 
-    @app.middleware("http")
-    async def premium_gate_middleware(request: Request, call_next):
-        request.state.premium_banner_html = ""
 
-        if not request.url.path.startswith("/app"):
-            return await call_next(request)
+# ✅ apaga o cookie de flashes depois de exibido (ASGI puro, sem BaseHTTPMiddleware)
+app.add_middleware(FlashClearMiddleware)
 
-        try:
-            uid_raw = get_user_id_from_request(request)
-            if uid_raw:
-                uid = int(uid_raw)
-
-                info = get_gate_info(uid)
-                request.state.premium_banner_html = render_banner_html(info)
-
-                if (
-                    (not info.is_pro)
-                    and info.at_limit
-                    and request.url.path == "/app/budgets/new"
-                    and request.method.upper() == "POST"
-                ):
-                    return premium_templates.TemplateResponse(
-                        "premium_gate/limit.html",
-                        {"request": request, "flashes": [], "user": None, "info": info},
-                        status_code=403,
-                    )
-        except Exception:
-            request.state.premium_banner_html = ""
-
-        return await call_next(request)
 
+# ✅ PREMIUM GATE MIDDLEWARE (banner + bloqueio no limite) — isolado e seguro (fail-open)
+try:
+    from app.modules.premium_gate.middleware import PremiumGateMiddleware
+
+    app.add_middleware(PremiumGateMiddleware)
 except Exception as e:
-    print(f"[modules] PremiumGate middleware NOT loaded: {e}")
+    logger.warning("[modules] PremiumGate middleware NOT loaded: %s", e)
 
 
+# ✅ Registrado por último = mais externo: o escopo da Session vale para todo o request
+app.add_middleware(DBSessionMiddleware)
+
+
+# landing e health são async: rodam direto no event loop, sem passar pelo threadpool.
+# ⚠️ Nada bloqueante aqui dentro (banco sync, arquivo, rede): se precisar,
+# use run_in_threadpool ou um driver async.
 @app.get("/", response_class=HTMLResponse)
-def landing(request: Request):
+async def landing(request: Request):
     flashes = pop_flashes(request)
-    return templates.TemplateResponse(
-        "landing.html",
-        {
-            "request": request,
-            "flashes": flashes,
-            "now": datetime.now(timezone.utc),
-            "product_name": "FECHA INSTALAÇÃO",
-        },
+    if not flashes and LANDING_HTML_BYTES is not None:
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            return HTMLResponse(
+                LANDING_HTML_GZ,
+                headers={"content-encoding": "gzip", "vary": "accept-encoding"},
+            )
+        return HTMLResponse(LANDING_HTML_BYTES, headers={"vary": "accept-encoding"})
+    return HTMLResponse(
+        LANDING_TMPL.render(
+            request=request,
+            flashes=flashes,
+            product_name="FECHA INSTALAÇÃO",
+        )
     )
 
 
-@app.get("/health")
-def health():
-    return {"ok": True, "app": "fecha-instalacao"}
+# corpo do health fixo: serializado uma vez, não a cada checagem do monitor
+HEALTH_BODY = orjson.dumps({"ok": True, "app": "fecha-instalacao"})
 
 
-# ===== ROUTERS DO CORE =====
-app.include_router(auth_router)
-app.include_router(app_router)
-app.include_router(webhook_router)
+@app.get("/health", include_in_schema=False)
+async def health():
+    return Response(content=HEALTH_BODY, media_type="application/json")
 
-# ✅ já estava
-app.include_router(retention.router)
 
-# ✅ CORRIGIDO: inclui upgrade.py (vai registrar /app/upgrade e /app/checkout)
-app.include_router(upgrade_router)
+# ===== ROUTERS DO CORE =====
+# (router, aparece no /docs?) — webhook é chamado pela Kiwify, não faz parte da API
+ROUTERS = (
+    (auth_router, True),
+    (app_router, True),
+    (webhook_router, False),
+    (retention.router, True),  # ✅ já estava
+    (upgrade_router, True),  # ✅ CORRIGIDO: registra /app/upgrade e /app/checkout
+)
+
+for router, in_schema in ROUTERS:
+    app.include_router(router, include_in_schema=in_schema)
+
+# ===== MÓDULOS OPCIONAIS =====
+# Importados só no startup (lifespan), fora do import do main.py.
+# Módulo ausente ou sem dependência: o app sobe sem ele.
+_MODULE_ROUTERS = (
+    ("app.modules.onboarding.router", "router"),  # /app/onboarding
+)
+
+
+def _module_available(module_path: str) -> bool:
+    # só procura no sys.path, sem executar o módulo
+    try:
+        return importlib.util.find_spec(module_path) is not None
+    except ModuleNotFoundError:  # pacote pai ausente
+        return False
+
+
+def _register_modules() -> None:
+    for module_path, attr in _MODULE_ROUTERS:
+        if not _module_available(module_path):
+            logger.info("[modules] %s NOT installed, skipping", module_path)
+            continue
+        try:
+            module = importlib.import_module(module_path)
+        except ImportError as e:
+            # dependência opcional do módulo faltando; erro de código dentro do módulo sobe
+            logger.warning("[modules] %s NOT loaded: %s", module_path, e)
+            continue
+        app.include_router(getattr(module, attr))
 
-# ✅ CORRIGIDO: inclui onboarding (vai registrar /app/onboarding do módulo)
-app.include_router(onboarding_router)
+
+# resposta fixa, montada uma vez: reaproveitada em todo 401 (sem corpo, sem background).
+# Quem mexe nos headers (FlashClearMiddleware) monta lista nova, não altera esta.
+_LOGIN_REDIRECT = Response(status_code=303, headers={"location": "/login"})
 
 
 @app.exception_handler(401)
-def _unauthorized(_, __):
-    return RedirectResponse(url="/login", status_code=303)
\ No newline at end of file
+async def _unauthorized(_, __):
+    return _LOGIN_REDIRECT
+
+
+# ===== EXECUÇÃO DIRETA (python main.py) =====
+# Produção com gunicorn: ver README.
+# Workers fixos (não 2×CPU+1): cada worker abre os próprios pools do banco e o total
+#   workers × (DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW)
+# precisa caber no max_connections do Neon. Padrão: 2 × (10+10+5+5) = 60 conexões no pico.
+WEB_CONCURRENCY_DEFAULT = 2
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        # uvloop não existe no Windows: cai no asyncio padrão
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY") or WEB_CONCURRENCY_DEFAULT),
+        access_log=False,
+    )
@@ -29,6 +29,7 @@ CREATE TABLE IF NOT EXISTS budgets (
 
 CREATE INDEX IF NOT EXISTS idx_budgets_user_id ON budgets(user_id);
 CREATE INDEX IF NOT EXISTS idx_budgets_created_at ON budgets(created_at);
+CREATE INDEX IF NOT EXISTS idx_budgets_user_created_at ON budgets(user_id, created_at);
 
 -- status permitido (MVP): awaiting | won | lost
 ALTER TABLE budgets
@@ -1,9 +1,40 @@
 from __future__ import annotations
 
+import hashlib
+import logging
+import sys
 from pathlib import Path
 
-from sqlalchemy import text
-from app.db.session import engine
+import sqlparse
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+
+logger = logging.getLogger("run_neon_sql")
+
+# script de uma vez só: sem pool (abre, aplica, fecha)
+engine = create_engine(settings.DATABASE_URL, poolclass=NullPool)
+
+# o script já controla a transação (engine.begin); os do arquivo ficam de fora
+_TX_CONTROL = {"BEGIN", "COMMIT", "START TRANSACTION", "END"}
+
+# hash do neon.sql já aplicado: rodar de novo sem mudança vira um SELECT só
+_MIGRATIONS_DDL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  hash       TEXT PRIMARY KEY,
+  applied_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def _statements(sql: str) -> list[str]:
+    out = []
+    for raw in sqlparse.split(sql):
+        stmt = sqlparse.format(raw, strip_comments=True).strip().rstrip(";").strip()
+        if stmt and stmt.upper() not in _TX_CONTROL:
+            out.append(stmt)
+    return out
 
 
 def main() -> None:
@@ -11,14 +42,37 @@ def main() -> None:
     if not sql_path.exists():
         raise SystemExit("Arquivo neon.sql não encontrado na raiz do projeto.")
 
-    sql = sql_path.read_text(encoding="utf-8")
+    sql_bytes = sql_path.read_bytes()
+    digest = hashlib.sha256(sql_bytes).hexdigest()
+    force = "--force" in sys.argv[1:]
 
-    # Executa tudo dentro de uma transação
+    # Um comando por execute (erro aponta o comando certo), tudo numa transação só
     with engine.begin() as conn:
-        conn.execute(text(sql))
+        conn.execute(text(_MIGRATIONS_DDL))
+        applied = conn.execute(
+            text("SELECT 1 FROM schema_migrations WHERE hash = :h"), {"h": digest}
+        ).first()
+        if applied and not force:
+            logger.info("neon.sql já aplicado (sha256 %s); nada a fazer. Use --force para reaplicar.", digest[:12])
+            return
+
+        statements = _statements(sql_bytes.decode("utf-8"))
+        if engine.dialect.name == "postgresql":
+            # DDL de schema: não precisa esperar o fsync do WAL a cada commit
+            conn.execute(text("SET LOCAL synchronous_commit = off"))
+        total = len(statements)
+        for i, stmt in enumerate(statements, start=1):
+            first_line = stmt.splitlines()[0]
+            logger.info("[%d/%d] %s", i, total, first_line[:80])
+            conn.execute(text(stmt))
+
+        if not applied:
+            conn.execute(text("INSERT INTO schema_migrations (hash) VALUES (:h)"), {"h": digest})
 
-    print("✅ neon.sql aplicado com sucesso no banco:", engine.url)
+    # URL sem a senha (vai parar em log de CI)
+    logger.info("neon.sql aplicado com sucesso no banco: %s", engine.url.render_as_string(hide_password=True))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()